@@ -1,12 +1,142 @@
 import sqlite3
 import csv
-from typing import TypeVar, Optional, Union
+import queue
+import threading
+import warnings
+from contextlib import closing, suppress
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    cast,
+)
 
-from attrs import define, field, validators
+from attrs import NOTHING, Factory, define, field, fields, has, validators
 
 T = TypeVar("T")
 
 
+def _quote(name: str) -> str:
+    """Returns `name` quoted as an SQL identifier, escaping embedded quotes."""
+
+    return '"' + name.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=128)
+def _ident(name: str) -> str:
+    """Returns a caller-supplied name quoted, rejecting invalid identifiers."""
+
+    if not name.isidentifier():
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return _quote(name)
+
+
+def _idents(names: Iterable[str]) -> str:
+    """
+    Returns column names reported by SQLite (or checked against them) quoted
+    and joined as an SQL column list.
+    """
+
+    return ", ".join(map(_quote, names))
+
+
+def _values_getter(names: Sequence[str]) -> Callable[[Any], tuple]:
+    """Returns a callable returning the named attributes of an object."""
+
+    if len(names) == 1:
+        name = names[0]
+        return lambda obj: (getattr(obj, name),)
+    return attrgetter(*names)
+
+
+def _row_factory(
+    col_names: Sequence[str], c: type[T], validate: bool = True
+) -> Callable[[Sequence[Any]], T]:
+    """
+    Returns a callable constructing `c` from a row with the given columns.
+
+    For attrs classes, columns without a matching init argument are skipped
+    and rows are passed positionally when they line up with the fields.
+    Without `validate`, attrs instances are built bypassing `__init__`.
+    """
+
+    if not has(c):
+        names = tuple(col_names)
+        return lambda row: c(**dict(zip(names, row)))
+    if not validate:
+        return _unvalidated_row_factory(col_names, c)
+
+    init_fields = [a for a in fields(cast(Any, c)) if a.init]
+    kwargs = {
+        a.name: getattr(a, "alias", None) or a.name.lstrip("_")
+        for a in init_fields
+    }
+    keep = [i for i, name in enumerate(col_names) if name in kwargs]
+    names = tuple(kwargs[col_names[i]] for i in keep)
+    if len(keep) == len(col_names):
+        if list(col_names) == [a.name for a in init_fields] and not any(
+            a.kw_only for a in init_fields
+        ):
+            return lambda row: c(*row)
+        return lambda row: c(**dict(zip(names, row)))
+    idx = tuple(keep)
+    return lambda row: c(**dict(zip(names, (row[i] for i in idx))))
+
+
+def _unvalidated_row_factory(
+    col_names: Sequence[str], c: type[T]
+) -> Callable[[Sequence[Any]], T]:
+    """
+    Returns a callable setting row values directly on a new `c` instance.
+
+    Validators, converters and `__attrs_post_init__` are skipped; attributes
+    not present in the row are set to their defaults.
+    """
+
+    attributes = fields(cast(Any, c))
+    names = {a.name for a in attributes}
+    columns = tuple((i, n) for i, n in enumerate(col_names) if n in names)
+    defaults = tuple(
+        a
+        for a in attributes
+        if a.name not in col_names and a.default is not NOTHING
+    )
+    setattr_ = object.__setattr__
+
+    def build(row: Sequence[Any]) -> T:
+        obj = object.__new__(c)
+        for i, name in columns:
+            setattr_(obj, name, row[i])
+        for a in defaults:
+            value = a.default
+            if isinstance(value, cast(Any, Factory)):
+                value = (
+                    value.factory(obj) if value.takes_self else value.factory()
+                )
+            setattr_(obj, a.name, value)
+        return obj
+
+    return build
+
+
+def _iter_rows(
+    cur: sqlite3.Cursor, ctor: Callable[[Sequence[Any]], T]
+) -> Iterator[T]:
+    """Yields constructed rows from the cursor, closing it when done."""
+
+    with closing(cur):
+        for row in cur:
+            yield ctor(row)
+
+
 @define
 class SQLite3Database:
     """
@@ -18,15 +148,151 @@ class SQLite3Database:
         validator=validators.instance_of(sqlite3.Connection),
         init=False,
     )
+    _columns_cache: dict[str, list[str]] = field(
+        init=False, factory=dict, repr=False
+    )
+    _sql_cache: dict[tuple, str] = field(init=False, factory=dict, repr=False)
+    _ctor_cache: dict[tuple, Callable[[Sequence[Any]], Any]] = field(
+        init=False, factory=dict, repr=False
+    )
+    _getter_cache: dict[tuple, Callable[[Any], tuple]] = field(
+        init=False, factory=dict, repr=False
+    )
 
     def __attrs_post_init__(self):
         """Creates a connection to the SQLite3 database after initialization."""
-        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn = sqlite3.connect(
+            self.path, check_same_thread=False, cached_statements=512
+        )
+        self.conn.execute("PRAGMA cache_size=-20000")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+
+    def __enter__(self) -> "SQLite3Database":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Let SQLite update its query planner statistics and close.
+
+        Safe to call more than once; a failing `PRAGMA optimize` is ignored
+        so it cannot mask an error being unwound through `__exit__`.
+        """
+
+        try:
+            with suppress(sqlite3.Error):
+                self.conn.execute("PRAGMA optimize")
+        finally:
+            self.conn.close()
+        return
 
     @property
     def cursor(self) -> sqlite3.Cursor:
+        """Deprecated: returns a new cursor on every access."""
+
+        warnings.warn(
+            "SQLite3Database.cursor is deprecated, use conn.cursor() instead",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         return self.conn.cursor()
 
+    def _exec(self, stmt: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        """
+        Execute a statement on a new cursor of the connection.
+
+        Compiled statements are kept in the connection's LRU keyed by SQL
+        text, so repeated calls with the same statement skip parsing.
+        Each call gets its own cursor, so calls from several threads are safe.
+        """
+
+        return self.conn.execute(stmt, params)
+
+    def _ddl(self, stmt: str) -> None:
+        """
+        Run a single schema statement and commit.
+
+        Uses `execute` rather than `executescript` so that caller-supplied
+        SQL holding more than one statement is rejected.
+        """
+
+        self._exec(stmt)
+        self.conn.commit()
+
+    def _sql(
+        self,
+        key: tuple,
+        build: Callable[[], str],
+        columns: Iterable[str] = (),
+    ) -> str:
+        """
+        Returns the statement cached under `key`, building it on a miss.
+
+        `key` is `(operation, table, ...)`; on a miss, `columns` are checked
+        against the table so only known identifiers are interpolated.
+        """
+
+        stmt = self._sql_cache.get(key)
+        if stmt is None:
+            self._check_columns(key[1], columns)
+            stmt = self._sql_cache[key] = build()
+        return stmt
+
+    def _check_columns(self, table: str, columns: Iterable[str]) -> None:
+        """
+        Raise ValueError if any of the columns is not in the table, or
+        sqlite3.OperationalError if the table does not exist.
+        """
+
+        table_cols = self._require_columns(table)
+        unknown = [col for col in columns if col not in table_cols]
+        if unknown:
+            raise ValueError(
+                f"Unknown columns for table {table}: {', '.join(unknown)}"
+            )
+
+    def _invalidate(self, table: str) -> None:
+        """Drop cached columns and statements for the given table."""
+
+        self._columns_cache.pop(table, None)
+        self._sql_cache = {
+            k: v for k, v in self._sql_cache.items() if k[1] != table
+        }
+        self._ctor_cache = {
+            k: v for k, v in self._ctor_cache.items() if k[0] != table
+        }
+        self._getter_cache = {
+            k: v for k, v in self._getter_cache.items() if k[0] != table
+        }
+
+    def _ctor(
+        self, table: str, c: type[T], validate: bool = True
+    ) -> Callable[[Sequence[Any]], T]:
+        """Returns the cached row constructor for `c` on the given table."""
+
+        ctor = self._ctor_cache.get((table, c, validate))
+        if ctor is None:
+            ctor = _row_factory(self._require_columns(table), c, validate)
+            self._ctor_cache[(table, c, validate)] = ctor
+        return ctor
+
+    def _getter(
+        self, table: str, include_id: bool = False
+    ) -> Callable[[Any], tuple]:
+        """Returns the cached getter of an object's values for the table."""
+
+        getter = self._getter_cache.get((table, include_id))
+        if getter is None:
+            col_names = self._require_columns(table)
+            getter = _values_getter(col_names if include_id else col_names[1:])
+            self._getter_cache[(table, include_id)] = getter
+        return getter
+
     def get_table_info(
         self, table: str
     ) -> list[tuple[int, str, str, int, Optional[str], int]]:
@@ -35,12 +301,31 @@ class SQLite3Database:
             Id, Name, Type, Is not null, Default value, Is primary key
         """
 
-        stmt = f"PRAGMA table_info({table});"
-        return self.cursor.execute(stmt).fetchall()
+        stmt = f"PRAGMA table_info({_ident(table)});"
+        return self._exec(stmt).fetchall()
+
+    def _require_columns(self, table: str) -> list[str]:
+        """Returns the table's columns, raising if the table does not exist."""
+
+        columns = self._columns(table)
+        if not columns:
+            raise sqlite3.OperationalError(f"no such table: {table}")
+        return columns
 
     def table_columns(self, table: str) -> list[str]:
-        columns = self.get_table_info(table)
-        return [col[1] for col in columns]
+        """Returns the column names of the given table."""
+
+        return list(self._columns(table))
+
+    def _columns(self, table: str) -> list[str]:
+        """Returns the cached column names of the table; not to be mutated."""
+
+        columns = self._columns_cache.get(table)
+        if columns is None:
+            columns = [col[1] for col in self.get_table_info(table)]
+            if columns:
+                self._columns_cache[table] = columns
+        return columns
 
     def create_table(
         self, table: str, fields: dict[str, str], sql: str = ""
@@ -48,89 +333,249 @@ class SQLite3Database:
         """Create a table in the database."""
 
         stmt = f"""
-            CREATE TABLE IF NOT EXISTS {table} (
+            CREATE TABLE IF NOT EXISTS {_ident(table)} (
                 id INTEGER PRIMARY KEY,
-                {", ".join(" ".join([field[0], field[1].upper()]) for field in fields.items())}{"," if sql else ""}
+                {", ".join(" ".join([_ident(field[0]), field[1].upper()]) for field in fields.items())}{"," if sql else ""}
                 {sql}
             );
         """
-        self.cursor.execute(stmt)
-        self.conn.commit()
+        self._ddl(stmt)
+        self._invalidate(table)
         return self.get_table_info(table)
 
     def drop_table(self, table: str) -> None:
         """Drop given table"""
 
-        self.cursor.execute(f"DROP TABLE IF EXISTS {table}")
-        self.conn.commit()
+        self._ddl(f"DROP TABLE IF EXISTS {_ident(table)};")
+        self._invalidate(table)
         return
 
     def export_table_to_csv(self, table: str, file: str) -> None:
-        stmt = f"SELECT * FROM {table};"
-        data = self.cursor.execute(stmt).fetchall()
-        fieldnames = [n for n in self.table_columns(table)]
-        with open(file, "w", newline="", encoding="utf-8") as csv_file:
+        """Stream all rows of the given table to a CSV file in batches."""
+
+        fieldnames = self._columns(table)
+        stmt = self._select_stmt(table)
+        with closing(self.conn.cursor()) as cur, open(
+            file, "w", newline="", encoding="utf-8", buffering=1 << 20
+        ) as csv_file:
+            cur.arraysize = 1000
+            cur.execute(stmt)
             csv_writer = csv.writer(csv_file)
             csv_writer.writerow(fieldnames)
-            csv_writer.writerows(data)
+            while rows := cur.fetchmany():
+                csv_writer.writerows(rows)
         return
 
     def create_trigger(self, trigger_name: str, trigger_stmt: str) -> None:
-        self.cursor.execute(
+        self._ddl(
             f"""
-            CREATE TRIGGER {trigger_name}
+            CREATE TRIGGER {_ident(trigger_name)}
             {trigger_stmt};
         """
         )
-        self.conn.commit()
         return
 
     def insert_one(self, table: str, obj: T) -> None:
-        """Insert (or replace) an object into the given table"""
-
-        col_names = self.table_columns(table)
-        stmt = f"""
-            INSERT OR REPLACE INTO {table} ({', '.join(col_names[1:])})
-            VALUES ({', '.join(['?'] * len(col_names[1:]))});
         """
-        print(stmt)
-        self.cursor.execute(
-            stmt, tuple([getattr(obj, name) for name in col_names[1:]])
+        Insert an object into the given table, updating the existing row in
+        place when it conflicts on a unique key (or replacing it when the
+        table has no usable conflict target).
+        """
+
+        col_names = self._columns(table)
+        stmt = self._sql(
+            ("insert_one", table),
+            lambda: self._upsert_stmt(table, col_names[1:]),
         )
+        self._exec(stmt, self._getter(table)(obj))
         self.conn.commit()
         return
 
-    def insert_many(self, table: str, objs: list[T]) -> None:
-        """Insert many objects into a given table"""
+    def _unique_keys(self, table: str) -> list[tuple[str, ...]]:
+        """Returns the column sets of the table's unique indexes."""
 
-        col_names = self.table_columns(table)
-        placeholders = ", ".join(["?"] * len(col_names[1:]))
-        stmt = f"""
-            INSERT INTO {table} ({', '.join(col_names[1:])})
-            VALUES ({placeholders});
+        keys = []
+        indexes = self._exec(f"PRAGMA index_list({_ident(table)});").fetchall()
+        for _, index, unique, _, partial in indexes:
+            if not unique or partial:
+                continue
+            stmt = f"PRAGMA index_info({_quote(index)});"
+            info = self._exec(stmt).fetchall()
+            cols = tuple(col[2] for col in info)
+            if cols and None not in cols:
+                keys.append(cols)
+        return keys
+
+    def _upsert_stmt(self, table: str, col_names: Sequence[str]) -> str:
         """
-        values = [
-            tuple(getattr(obj, name) for name in col_names[1:]) for obj in objs
-        ]
-        self.cursor.executemany(stmt, values)
-        self.conn.commit()
+        Build an INSERT ... ON CONFLICT DO UPDATE statement for the table.
+
+        Conflict key columns are left as they are. Several conflict targets
+        need SQLite 3.35+, otherwise this falls back to INSERT OR REPLACE.
+        """
+
+        keys = self._unique_keys(table)
+        version = sqlite3.sqlite_version_info
+        if (
+            not keys
+            or version < (3, 24, 0)
+            or (len(keys) > 1 and version < (3, 35, 0))
+        ):
+            return f"""
+            INSERT OR REPLACE INTO {_ident(table)} ({_idents(col_names)})
+            VALUES ({', '.join(['?'] * len(col_names))});
+        """
+
+        def on_conflict(key: tuple[str, ...]) -> str:
+            quoted_key = set(map(_quote, key))
+            updates = ", ".join(
+                f"{col}=excluded.{col}"
+                for col in map(_quote, col_names)
+                if col not in quoted_key
+            )
+            action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+            return f"ON CONFLICT({_idents(key)}) {action}"
+
+        conflicts = " ".join(map(on_conflict, keys))
+        return f"""
+            INSERT INTO {_ident(table)} ({_idents(col_names)})
+            VALUES ({', '.join(['?'] * len(col_names))})
+            {conflicts};
+        """
+
+    def insert_many(
+        self, table: str, objs: Iterable[T], chunk_size: int = 10_000
+    ) -> None:
+        """
+        Insert many objects into a given table.
+
+        Rows are written in chunks of `chunk_size` within a single transaction.
+        """
+
+        stmt = self._insert_stmt(table, self._columns(table)[1:])
+        values = map(self._getter(table), objs)
+        with self.conn:
+            while chunk := list(islice(values, chunk_size)):
+                self.conn.executemany(stmt, chunk)
         return
 
+    def _insert_stmt(self, table: str, col_names: Sequence[str]) -> str:
+        """Returns the INSERT statement for the given columns of the table."""
+
+        return self._sql(
+            ("insert", table, tuple(col_names)),
+            lambda: f"""
+            INSERT INTO {_ident(table)} ({_idents(col_names)})
+            VALUES ({', '.join(['?'] * len(col_names))});
+        """,
+        )
+
     def insert_from_csv(
-        self, file: str, table: str, c: type[T], include_id=False
+        self,
+        file: str,
+        table: str,
+        c: type[T],
+        include_id=False,
+        validate: bool = True,
+        chunk_size: int = 1000,
     ) -> None:
-        with open(file, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            data: list[T] = []
-            for row in reader:
-                row_clean = {}
-                for k, v in row.items():
-                    if k == "id" and not include_id:
-                        continue
-                    if k in c.__annotations__:
-                        row_clean[k] = v
-                data.append(c(**row_clean))
-        self.insert_many(table, data)
+        """
+        Stream rows from a CSV file into the given table.
+
+        Rows are parsed (and validated) on a background thread while the
+        calling thread inserts them in chunks of `chunk_size`.
+        With `validate=False` rows are inserted as read, without building `c`
+        objects, for columns of the table present in the CSV header.
+        On both paths, ids from the CSV are only kept with `include_id`.
+        """
+
+        with open(file, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            table_cols = self._columns(table)
+            if validate:
+                field_names = [
+                    n
+                    for n in header
+                    if n in c.__annotations__ and (n != "id" or include_id)
+                ]
+                col_positions = [header.index(n) for n in field_names]
+                getter = self._getter(table, include_id)
+                stmt = self._insert_stmt(
+                    table, table_cols if include_id else table_cols[1:]
+                )
+
+                def values() -> Iterator[tuple]:
+                    for row in reader:
+                        if not row:
+                            continue
+                        row_values = (row[i] for i in col_positions)
+                        obj = c(**dict(zip(field_names, row_values)))
+                        yield getter(obj)
+
+            else:
+                idx = {name: i for i, name in enumerate(header)}
+                col_names = [
+                    n
+                    for n in (table_cols if include_id else table_cols[1:])
+                    if n in idx
+                ]
+                positions = [idx[n] for n in col_names]
+                stmt = self._insert_stmt(table, col_names)
+
+                def values() -> Iterator[tuple]:
+                    for row in reader:
+                        if not row:
+                            continue
+                        yield tuple(row[i] for i in positions)
+
+            self._insert_pipelined(stmt, values(), chunk_size)
+        return
+
+    def _insert_pipelined(
+        self, stmt: str, rows: Iterator[tuple], chunk_size: int
+    ) -> None:
+        """
+        Insert rows drawn from `rows` on a producer thread.
+
+        Chunks of `chunk_size` rows are handed over through a bounded queue
+        and written by the calling thread within a single transaction.
+        Errors raised while producing rows are re-raised here, rolling back.
+        """
+
+        chunks: queue.Queue[Optional[list[tuple]]] = queue.Queue(maxsize=64)
+        stop = threading.Event()
+        errors: list[BaseException] = []
+
+        def produce() -> None:
+            try:
+                while not stop.is_set():
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    chunks.put(chunk)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                chunks.put(None)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            with self.conn:
+                while (chunk := chunks.get()) is not None:
+                    self.conn.executemany(stmt, chunk)
+                if errors:
+                    raise errors[0]
+        finally:
+            stop.set()
+            while producer.is_alive():
+                try:
+                    chunks.get_nowait()
+                except queue.Empty:
+                    producer.join(0.01)
         return
 
     def select(
@@ -138,27 +583,70 @@ class SQLite3Database:
         table: str,
         c: type[T],
         query: dict[str, Union[str, int, float, bool]],
+        validate: bool = True,
     ) -> list[T]:
+        """
+        Select rows matching query.
 
-        col_names = self.table_columns(table)
-        stmt = f"""
-            SELECT {', '.join(col_names)} 
-            FROM {table}
-            WHERE {' AND '.join(f"{f}=?" for f in query.keys())};
+        With `validate=False`, attrs objects are built without running their
+        `__init__`, for rows coming from trusted data.
         """
-        res = self.cursor.execute(stmt, tuple(query.values())).fetchall()
-        items: list[T] = []
-        for row in res:
-            items.append(c(**dict(zip(col_names, row))))
-        return items
 
-    def select_all(self, table: str, c: type[T]) -> list[T]:
+        stmt = self._select_stmt(table, query)
+        ctor = self._ctor(table, c, validate)
+        return list(map(ctor, self._exec(stmt, tuple(query.values()))))
+
+    def select_all(
+        self, table: str, c: type[T], validate: bool = True
+    ) -> list[T]:
         """Select all rows from the given table."""
 
-        col_names = self.table_columns(table)
-        res = self.cursor.execute(f"SELECT * FROM {table}").fetchall()
-        items: list[T] = [c(**dict(zip(col_names, row))) for row in res]
-        return items
+        stmt = self._select_stmt(table)
+        ctor = self._ctor(table, c, validate)
+        return list(map(ctor, self._exec(stmt)))
+
+    def select_iter(
+        self,
+        table: str,
+        c: type[T],
+        query: Optional[dict[str, Union[str, int, float, bool]]] = None,
+        validate: bool = True,
+    ) -> Iterator[T]:
+        """
+        Lazily yield rows matching query, or all rows when no query is given.
+
+        Rows are read on a dedicated cursor which keeps its read transaction
+        open until the iterator is exhausted or its `close()` is called.
+        """
+
+        query = query or {}
+        stmt = self._select_stmt(table, query)
+        ctor = self._ctor(table, c, validate)
+        cur = self.conn.execute(stmt, tuple(query.values()))
+        return _iter_rows(cur, ctor)
+
+    def _select_stmt(
+        self,
+        table: str,
+        query: Optional[dict[str, Union[str, int, float, bool]]] = None,
+    ) -> str:
+        """Returns the SELECT statement for the given table and query keys."""
+
+        if not query:
+            return self._sql(
+                ("select_all", table),
+                lambda: f"SELECT * FROM {_ident(table)};",
+            )
+        col_names = self._columns(table)
+        return self._sql(
+            ("select", table, tuple(query)),
+            lambda: f"""
+            SELECT {_idents(col_names)} 
+            FROM {_ident(table)}
+            WHERE {' AND '.join(f"{_quote(f)}=?" for f in query.keys())};
+        """,
+            query,
+        )
 
     def update(
         self,
@@ -168,15 +656,18 @@ class SQLite3Database:
     ) -> None:
         """Update rows meeting query criteria"""
 
-        col_names = self.table_columns(table)
-        stmt = f"""
-            UPDATE {table}
-            SET {', '.join(f"{col}=?" for col in col_names)}
-            WHERE {' AND '.join(f"{f}=?" for f in query.keys())};
-        """
-        new_values = [getattr(obj, name) for name in col_names]
-        params = (*new_values, *query.values())
-        self.cursor.execute(stmt, params)
+        col_names = self._columns(table)
+        stmt = self._sql(
+            ("update", table, tuple(query)),
+            lambda: f"""
+            UPDATE {_ident(table)}
+            SET {', '.join(f"{_quote(col)}=?" for col in col_names)}
+            WHERE {' AND '.join(f"{_quote(f)}=?" for f in query.keys())};
+        """,
+            query,
+        )
+        params = (*self._getter(table, include_id=True)(obj), *query.values())
+        self._exec(stmt, params)
         self.conn.commit()
         return
 
@@ -185,17 +676,24 @@ class SQLite3Database:
     ) -> None:
         """Delete all rows in table matching query"""
 
-        stmt = f"""
-            DELETE FROM {table}
-            WHERE {' AND '.join(f"{f}=?" for f in query.keys())};
-        """
-        self.cursor.execute(stmt, tuple(query.values()))
+        stmt = self._sql(
+            ("delete", table, tuple(query)),
+            lambda: f"""
+            DELETE FROM {_ident(table)}
+            WHERE {' AND '.join(f"{_quote(f)}=?" for f in query.keys())};
+        """,
+            query,
+        )
+        self._exec(stmt, tuple(query.values()))
         self.conn.commit()
         return
 
     def delete_all(self, table: str) -> None:
         """Delete all data in given table"""
 
-        self.cursor.execute(f"DELETE from {table}")
+        stmt = self._sql(
+            ("delete_all", table), lambda: f"DELETE FROM {_ident(table)};"
+        )
+        self._exec(stmt)
         self.conn.commit()
         return
@@ -1,34 +1,29 @@
 import pytest
 
 import csv
-from pprint import pprint
+import re
+import sqlite3
+import threading
 from typing import Optional
 
 from attrs import define, field, validators, converters
 
 from gd_sqlite3 import SQLite3Database
 
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+_POSTCODE_RE = re.compile(
+    r"^[A-Za-z]{1,2}(?:\d{1,2}[A-Za-z]?|\d[A-Za-z]{2})\s?\d[A-Za-z]{2}$"
+)
+
 
 @define
 class BaseMeta:
     created_on: Optional[str] = field(
-        validator=[
-            validators.optional(
-                validators.matches_re(
-                    (r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
-                )
-            )
-        ],
+        validator=[validators.optional(validators.matches_re(_TIMESTAMP_RE))],
         default=None,
     )
     last_updated: Optional[str] = field(
-        validator=[
-            validators.optional(
-                validators.matches_re(
-                    (r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
-                )
-            )
-        ],
+        validator=[validators.optional(validators.matches_re(_TIMESTAMP_RE))],
         default=None,
     )
 
@@ -54,13 +49,7 @@ class Location(BaseMeta):
     phone: str = field(validator=[validators.instance_of(str)])
     address: str = field(validator=[validators.instance_of(str)])
     city: str = field(validator=[validators.instance_of(str)])
-    postcode: str = field(
-        validator=[
-            validators.matches_re(
-                r"^[A-Za-z]{1,2}(?:\d{1,2}[A-Za-z]?|\d[A-Za-z]{2})\s?\d[A-Za-z]{2}$"
-            )
-        ]
-    )
+    postcode: str = field(validator=[validators.matches_re(_POSTCODE_RE)])
     latitude: float = field(
         validator=[validators.instance_of(float)], converter=float
     )
@@ -96,10 +85,48 @@ class Location(BaseMeta):
     size: int = field(validator=[validators.instance_of(int)], converter=int)
 
 
-@pytest.fixture
+@define(kw_only=True)
+class Item:
+    id: Optional[int] = field(
+        validator=[validators.optional(validators.instance_of(int))],
+        converter=converters.optional(int),
+        default=None,
+    )
+    name: str = field(validator=[validators.instance_of(str)])
+    size: int = field(
+        validator=[validators.instance_of(int), validators.le(1000)],
+        converter=int,
+    )
+
+
+@define(kw_only=True)
+class Note:
+    id: Optional[int] = field(default=None)
+    name: str = field(validator=[validators.instance_of(str)])
+    note: Optional[str] = field(default=None)
+
+
+@pytest.fixture(scope="session")
 def db():
-    db = SQLite3Database("tests/test.db")
-    return db
+    with SQLite3Database("tests/test.db") as db:
+        yield db
+
+
+@pytest.fixture
+def items_db(tmp_path):
+    with SQLite3Database(str(tmp_path / "items.db")) as db:
+        db.create_table(
+            "items", {"name": "TEXT NOT NULL UNIQUE", "size": "INTEGER"}
+        )
+        yield db
+
+
+def write_items_csv(path, rows: list[tuple[int, str, int]]) -> str:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv_writer = csv.writer(f)
+        csv_writer.writerow(["id", "name", "size"])
+        csv_writer.writerows(rows)
+    return str(path)
 
 
 @pytest.fixture
@@ -211,13 +238,37 @@ def test_insert_one(db: SQLite3Database, loc: Location):
     assert items[0].name == loc.name
     assert items[0].postcode == loc.postcode
 
-    print(items)
+
+def test_insert_one_conflict_updates_in_place(
+    db: SQLite3Database, loc: Location
+):
+    """Test that inserting a conflicting object updates the existing row"""
+
+    (existing,) = db.select("locations", Location, {"slug": loc.slug})
+    loc.phone = "0121 000 0000"
+    loc.created_on = existing.created_on
+    db.insert_one("locations", loc)
+    items = db.select("locations", Location, {"slug": loc.slug})
+    assert len(items) == 1
+    assert items[0].id == existing.id
+    assert items[0].phone == loc.phone
+    assert existing.created_on is not None
+    assert items[0].created_on == existing.created_on
 
 
 def test_select_all(db: SQLite3Database):
     items = db.select_all("locations", Location)
     for item in items:
         assert isinstance(item, Location)
+    assert db.select_all("locations", Location, validate=False) == items
+
+
+def test_select_iter(db: SQLite3Database, loc: Location):
+    items = db.select_iter("locations", Location, {"slug": loc.slug})
+    assert [item.slug for item in items] == [loc.slug]
+
+    items = db.select_iter("locations", Location)
+    assert len(list(items)) == len(db.select_all("locations", Location))
 
 
 def test_update(db: SQLite3Database, loc: Location):
@@ -239,11 +290,242 @@ def test_delete(db: SQLite3Database):
 def test_insert_from_csv(db: SQLite3Database):
     db.insert_from_csv("tests/locations.data.csv", "locations", Location)
     locations = db.select_all("locations", Location)
-    pprint(locations, sort_dicts=False, width=100, indent=2)
+    for location in locations:
+        assert isinstance(location, Location)
 
 
 def test_export_to_csv(db: SQLite3Database):
     db.export_table_to_csv("locations", "tests/export.data.csv")
-    csv_reader = csv.reader("export.data.csv")
-    for row in csv_reader:
-        pprint(row, sort_dicts=False, indent=2)
+    with open("tests/export.data.csv", newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    assert header == db.table_columns("locations")
+
+
+@pytest.mark.parametrize("validate", [True, False])
+@pytest.mark.parametrize("include_id", [True, False])
+def test_insert_from_csv_include_id(
+    items_db: SQLite3Database, tmp_path, validate: bool, include_id: bool
+):
+    """Test that CSV ids are kept only with include_id, on both paths"""
+
+    file = write_items_csv(
+        tmp_path / "items.csv", [(100 + i, f"item-{i}", i) for i in range(3)]
+    )
+    items_db.insert_from_csv(
+        file, "items", Item, include_id=include_id, validate=validate
+    )
+    items = items_db.select_all("items", Item)
+    assert [item.id for item in items] == (
+        [100, 101, 102] if include_id else [1, 2, 3]
+    )
+    assert [(item.name, item.size) for item in items] == [
+        ("item-0", 0),
+        ("item-1", 1),
+        ("item-2", 2),
+    ]
+
+
+def test_select_table_created_elsewhere(tmp_path):
+    """Test that nothing is cached for a table before it exists"""
+
+    path = str(tmp_path / "late.db")
+    with SQLite3Database(path) as db:
+        with pytest.raises(sqlite3.OperationalError):
+            db.select_all("items", Item)
+        with pytest.raises(sqlite3.OperationalError):
+            db.select("items", Item, {"name": "x"})
+
+        other = sqlite3.connect(path)
+        other.execute(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, size INT)"
+        )
+        other.execute("INSERT INTO items (name, size) VALUES ('x', 1)")
+        other.commit()
+        other.close()
+
+        assert db.select_all("items", Item) == [Item(id=1, name="x", size=1)]
+        assert db.select("items", Item, {"name": "x"}) == [
+            Item(id=1, name="x", size=1)
+        ]
+
+
+def test_ddl_rejects_multiple_statements(items_db: SQLite3Database):
+    """Test that caller SQL cannot smuggle extra statements into DDL"""
+
+    with pytest.raises((sqlite3.ProgrammingError, sqlite3.Warning)):
+        items_db.create_table(
+            "other", {"name": "TEXT"}, sql="CHECK (1)); DROP TABLE items; --"
+        )
+    assert [col[1] for col in items_db.get_table_info("items")] == [
+        "id",
+        "name",
+        "size",
+    ]
+
+
+def test_insert_one_with_quoted_index_name(items_db: SQLite3Database):
+    """Test that index names reported by SQLite are not rejected"""
+
+    items_db.conn.execute('CREATE UNIQUE INDEX "idx-size" ON items (size)')
+    items_db.insert_one("items", Item(name="x", size=1))
+    items_db.insert_one("items", Item(name="x", size=2))
+    items = items_db.select_all("items", Item)
+    assert items == [Item(id=1, name="x", size=2)]
+
+
+def test_close_is_idempotent(tmp_path):
+    with SQLite3Database(str(tmp_path / "close.db")) as db:
+        db.close()
+    db.close()
+
+
+def test_insert_from_csv_pipelined(items_db: SQLite3Database, tmp_path):
+    """Test that rows spanning many chunks are all inserted"""
+
+    file = write_items_csv(
+        tmp_path / "items.csv", [(i, f"item-{i}", i) for i in range(1000)]
+    )
+    items_db.insert_from_csv(file, "items", Item, chunk_size=10)
+    items = items_db.select_all("items", Item)
+    assert [item.name for item in items] == [f"item-{i}" for i in range(1000)]
+    assert not items_db.conn.in_transaction
+
+
+def test_insert_from_csv_validation_error_rolls_back(
+    items_db: SQLite3Database, tmp_path
+):
+    """Test that a row failing validation midway commits nothing"""
+
+    rows = [(i, f"item-{i}", i) for i in range(1000)]
+    rows[500] = (500, "item-500", 5000)
+    file = write_items_csv(tmp_path / "items.csv", rows)
+    with pytest.raises(ValueError):
+        items_db.insert_from_csv(file, "items", Item, chunk_size=10)
+    assert items_db.select_all("items", Item) == []
+    assert not items_db.conn.in_transaction
+
+
+def test_insert_from_csv_writer_error_stops_producer(
+    items_db: SQLite3Database, tmp_path
+):
+    """Test that a failing writer does not leave the producer blocked"""
+
+    items_db.create_trigger(
+        "items_fail",
+        """
+            BEFORE INSERT ON items
+            WHEN NEW.name = 'item-900'
+            BEGIN
+                SELECT RAISE(ABORT, 'disk I/O error');
+            END
+        """,
+    )
+    file = write_items_csv(
+        tmp_path / "items.csv", [(i, f"item-{i}", i) for i in range(1000)]
+    )
+    threads = threading.active_count()
+    with pytest.raises(sqlite3.IntegrityError):
+        items_db.insert_from_csv(file, "items", Item, chunk_size=1)
+    assert threading.active_count() == threads
+    assert not items_db.conn.in_transaction
+    assert items_db.select_all("items", Item) == []
+
+
+def test_concurrent_selects(items_db: SQLite3Database):
+    """Test that selects from several threads do not share a cursor"""
+
+    items_db.insert_many(
+        "items", (Item(name=f"item-{i}", size=i) for i in range(100))
+    )
+    expected = items_db.select_all("items", Item)
+    errors: list[BaseException] = []
+
+    def select() -> None:
+        try:
+            for i in range(200):
+                items = items_db.select("items", Item, {"size": i % 100})
+                assert items == [expected[i % 100]]
+                assert items_db.select_all("items", Item) == expected
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=select) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_insert_many_chunked(items_db: SQLite3Database):
+    """Test that objects spanning several chunks commit as one transaction"""
+
+    items_db.insert_many(
+        "items",
+        (Item(name=f"item-{i}", size=i % 1000) for i in range(2500)),
+        chunk_size=1000,
+    )
+    items = items_db.select_all("items", Item)
+    assert len(items) == 2500
+    assert items[-1] == Item(id=2500, name="item-2499", size=499)
+    assert not items_db.conn.in_transaction
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test_insert_from_csv_skips_blank_lines(
+    items_db: SQLite3Database, tmp_path, validate: bool
+):
+    """Test that blank lines in the CSV are skipped"""
+
+    file = tmp_path / "items.csv"
+    file.write_text("id,name,size\n1,a,1\n\n2,b,2\n\n", encoding="utf-8")
+    items_db.insert_from_csv(str(file), "items", Item, validate=validate)
+    items = items_db.select_all("items", Item)
+    assert [(item.name, item.size) for item in items] == [("a", 1), ("b", 2)]
+
+
+def test_table_columns_returns_copy(items_db: SQLite3Database):
+    """Test that mutating the returned columns does not corrupt the cache"""
+
+    items_db.table_columns("items").append("extra")
+    assert items_db.table_columns("items") == ["id", "name", "size"]
+    items_db.insert_one("items", Item(name="x", size=1))
+    assert items_db.select_all("items", Item) == [Item(id=1, name="x", size=1)]
+
+
+def test_export_to_csv_rows(items_db: SQLite3Database, tmp_path):
+    """Test that every row is written when the export spans several batches"""
+
+    items_db.insert_many(
+        "items", (Item(name=f"item-{i}", size=i % 1000) for i in range(2500))
+    )
+    file = str(tmp_path / "export.csv")
+    items_db.export_table_to_csv("items", file)
+    with open(file, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "name", "size"]
+    assert rows[1:] == [
+        [str(i + 1), f"item-{i}", str(i % 1000)] for i in range(2500)
+    ]
+
+
+def test_insert_one_conflict_sets_null(items_db: SQLite3Database):
+    """Test that a conflicting insert can set a nullable column to NULL"""
+
+    items_db.create_table(
+        "notes", {"name": "TEXT NOT NULL UNIQUE", "note": "TEXT"}
+    )
+    items_db.insert_one("notes", Note(name="a", note="hello"))
+    items_db.insert_one("notes", Note(name="a", note=None))
+    assert items_db.select_all("notes", Note) == [Note(id=1, name="a")]
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test_insert_from_csv_missing_table(
+    items_db: SQLite3Database, tmp_path, validate: bool
+):
+    """Test that inserting into a missing table raises OperationalError"""
+
+    file = write_items_csv(tmp_path / "items.csv", [(1, "a", 1)])
+    with pytest.raises(sqlite3.OperationalError):
+        items_db.insert_from_csv(file, "missing", Item, validate=validate)